@@ -1,13 +1,44 @@
 import streamlit as st
 import json
-import io
 from pydub import AudioSegment
 from elevenlabs import ElevenLabs, VoiceSettings
 import requests
 import os
 import base64
+import subprocess
+import tempfile
 import database  # Import our database module
 import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# orjson is much faster on large scripts; fall back to the stdlib if missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# websockets is used for low-latency regeneration; without it the HTTP API is used
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:
+    ws_connect = None
+
+# Maximum number of concurrent text-to-speech requests sent to ElevenLabs
+MAX_TTS_WORKERS = 8
+# Retries, with exponential backoff, for lines rejected by ElevenLabs' concurrency limit
+TTS_MAX_RETRIES = 3
+
+# Length of the silence inserted after each line when finalizing
+PAUSE_DURATION_MS = 300
+
+# ElevenLabs multi-context text-to-speech WebSocket. One connection per voice is
+# kept open for the session and each regeneration runs in its own context.
+TTS_WEBSOCKET_URL = (
+    "wss://api.elevenlabs.io/v1/text-to-speech/{voice_id}/multi-stream-input"
+    "?model_id=eleven_multilingual_v2&output_format=mp3_44100_128&inactivity_timeout=180"
+)
+TTS_WEBSOCKET_TIMEOUT = 30
 
 # Initialize session state for API key
 if 'api_key' not in st.session_state:
@@ -15,42 +46,62 @@ if 'api_key' not in st.session_state:
     if not st.session_state.api_key:
         st.error("Please set up your ElevenLabs API key in the app settings")
 
+# Shared HTTP session per API key so TLS connections to ElevenLabs are reused
+@st.cache_resource
+def get_session(api_key):
+    session = requests.Session()
+    session.headers.update({
+        "Accept": "application/json",
+        "xi-api-key": api_key
+    })
+    return session
+
+# Shared ElevenLabs client per API key
+@st.cache_resource
+def get_client(api_key):
+    return ElevenLabs(api_key=api_key)
+
 # Function to initialize ElevenLabs client
 def init_elevenlabs_client():
-    return ElevenLabs(api_key=st.session_state.api_key)
+    return get_client(st.session_state.api_key)
+
+# Fetch voices from ElevenLabs. Failures raise so they are never cached.
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_voices(api_key):
+    url = "https://api.elevenlabs.io/v1/voices"
+    response = get_session(api_key).get(url)
+    response.raise_for_status()
+    voices_data = response.json()
+    return {voice["name"]: {"voice_id": voice["voice_id"], "samples": voice.get("samples", [])} 
+            for voice in voices_data["voices"]}
 
 # Get available voices from ElevenLabs
-def get_available_voices():
+def get_available_voices(api_key):
     try:
-        url = "https://api.elevenlabs.io/v1/voices"
-        headers = {
-            "Accept": "application/json",
-            "xi-api-key": st.session_state.api_key
-        }
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            voices_data = response.json()
-            voices = {voice["name"]: {"voice_id": voice["voice_id"], "samples": voice.get("samples", [])} 
-                     for voice in voices_data["voices"]}
-            if not voices:
-                st.error("No voices found in the ElevenLabs response")
-                return {"Default Voice": {"voice_id": "21m00Tcm4TlvDq8ikWAM", "samples": []}}  # Default voice
-            return voices
-        else:
-            st.error(f"Failed to fetch voices: {response.status_code}")
-            # Return a default voice if API call fails
-            return {"Default Voice": {"voice_id": "21m00Tcm4TlvDq8ikWAM", "samples": []}}
+        voices = fetch_voices(api_key)
+        if not voices:
+            st.error("No voices found in the ElevenLabs response")
+            return {"Default Voice": {"voice_id": "21m00Tcm4TlvDq8ikWAM", "samples": []}}  # Default voice
+        return voices
+    except requests.HTTPError as e:
+        st.error(f"Failed to fetch voices: {e.response.status_code}")
+        # Return a default voice if API call fails
+        return {"Default Voice": {"voice_id": "21m00Tcm4TlvDq8ikWAM", "samples": []}}
     except Exception as e:
         st.error(f"Error fetching voices: {str(e)}")
         # Return a default voice if anything fails
         return {"Default Voice": {"voice_id": "21m00Tcm4TlvDq8ikWAM", "samples": []}}
 
+# Download a voice sample clip. Samples never change, so they are cached for a day.
+@st.cache_data(ttl=24*60*60, show_spinner=False)
+def fetch_voice_sample(voice_id, sample_id, api_key):
+    audio_stream = get_client(api_key).samples.get_audio(voice_id=voice_id, sample_id=sample_id)
+    return b''.join(audio_stream)
+
 # Function to get and play voice sample
-def get_voice_sample(voice_id, sample_id):
+def get_voice_sample(voice_id, sample_id, api_key):
     try:
-        client = init_elevenlabs_client()
-        audio_data = client.samples.get_audio(voice_id=voice_id, sample_id=sample_id)
-        return audio_data
+        return fetch_voice_sample(voice_id, sample_id, api_key)
     except Exception as e:
         st.error(f"Failed to get voice sample: {str(e)}")
         return None
@@ -78,27 +129,132 @@ def init_session_state():
     if 'current_step' not in st.session_state:
         st.session_state.current_step = 2
     if 'available_voices' not in st.session_state:
-        st.session_state.available_voices = get_available_voices()
+        st.session_state.available_voices = get_available_voices(st.session_state.api_key)
 
-# Function to generate audio for a single line
-def generate_audio(text, voice_id, speaker):
-    client = init_elevenlabs_client()
-    voice_settings = st.session_state.config['voice_settings_per_speaker'][speaker]
+# Function to synthesize a single line. Does not touch session state, so it is
+# safe to call from worker threads. Requests rejected with HTTP 429 (too many
+# concurrent requests) are retried after a backoff.
+def synthesize_line(client, text, voice_id, voice_settings):
+    for attempt in range(TTS_MAX_RETRIES + 1):
+        try:
+            return synthesize_line_once(client, text, voice_id, voice_settings)
+        except Exception as e:
+            if getattr(e, 'status_code', None) != 429 or attempt == TTS_MAX_RETRIES:
+                raise
+            time.sleep(2 ** attempt)
+
+# Function to make one text-to-speech request for a line
+def synthesize_line_once(client, text, voice_id, voice_settings):
     settings = VoiceSettings(
         stability=voice_settings['stability'],
         similarity_boost=voice_settings['similarity_boost'],
         style=voice_settings['style']
     )
-    audio_stream = client.text_to_speech.convert(
+    audio_stream = client.text_to_speech.stream(
         voice_id=voice_id,
-        optimize_streaming_latency=0,
         output_format="mp3_44100_128",
         text=text,
         voice_settings=settings,
         model_id="eleven_multilingual_v2",
     )
-    audio_data = b''.join(chunk for chunk in audio_stream)
-    return AudioSegment.from_mp3(io.BytesIO(audio_data))
+    buffer = bytearray()
+    for chunk in audio_stream:
+        buffer.extend(chunk)
+    # Playback, saving and finalizing all work on the encoded MP3, so it is
+    # never decoded into an AudioSegment
+    return bytes(buffer)
+
+# Function to generate audio for a single line
+def generate_audio(text, voice_id, speaker):
+    client = init_elevenlabs_client()
+    voice_settings = st.session_state.config['voice_settings_per_speaker'][speaker]
+    return synthesize_line(client, text, voice_id, voice_settings)
+
+# Function to get this session's open WebSocket for a voice, connecting if needed
+def get_tts_websocket(voice_id):
+    connections = st.session_state.setdefault('tts_websockets', {})
+    if voice_id not in connections:
+        connections[voice_id] = ws_connect(
+            TTS_WEBSOCKET_URL.format(voice_id=voice_id),
+            additional_headers={"xi-api-key": st.session_state.api_key}
+        )
+    return connections[voice_id]
+
+# Function to close and forget a voice's WebSocket after an error
+def drop_tts_websocket(voice_id):
+    ws = st.session_state.get('tts_websockets', {}).pop(voice_id, None)
+    if ws is not None:
+        try:
+            ws.close()
+        except Exception:
+            pass
+
+# Function to synthesize a line over an open WebSocket. Audio chunks for the
+# context are collected until ElevenLabs marks it final.
+def synthesize_line_ws(ws, text, voice_settings):
+    context_id = str(uuid.uuid4())
+    ws.send(json.dumps({"text": " ", "voice_settings": voice_settings, "context_id": context_id}))
+    ws.send(json.dumps({"text": text + " ", "context_id": context_id}))
+    ws.send(json.dumps({"context_id": context_id, "flush": True}))
+    ws.send(json.dumps({"context_id": context_id, "close_context": True}))
+    buffer = bytearray()
+    while True:
+        message = json.loads(ws.recv(timeout=TTS_WEBSOCKET_TIMEOUT))
+        if message.get("contextId") != context_id:
+            continue
+        if message.get("audio"):
+            buffer.extend(base64.b64decode(message["audio"]))
+        if message.get("isFinal"):
+            break
+    if not buffer:
+        raise RuntimeError("No audio received from the ElevenLabs WebSocket")
+    return bytes(buffer)
+
+# Function to regenerate a single line, reusing the session's WebSocket so
+# repeated regenerations skip the per-request HTTPS setup. A connection that
+# has gone stale is reopened once before falling back to the HTTP API.
+def regenerate_audio(text, voice_id, speaker):
+    if ws_connect is not None:
+        voice_settings = st.session_state.config['voice_settings_per_speaker'][speaker]
+        for _ in range(2):
+            try:
+                return synthesize_line_ws(get_tts_websocket(voice_id), text, voice_settings)
+            except Exception:
+                drop_tts_websocket(voice_id)
+    return generate_audio(text, voice_id, speaker)
+
+# Silence encoded to match the ElevenLabs mp3_44100_128 output, so it
+# can be stream-copied between segments
+@st.cache_resource
+def get_pause_mp3():
+    pause = AudioSegment.silent(duration=PAUSE_DURATION_MS, frame_rate=44100)
+    return pause.export(format="mp3", bitrate="128k").read()
+
+# Function to join MP3 byte strings with ffmpeg's concat demuxer. Streams are
+# copied rather than decoded and re-encoded.
+def concat_mp3(mp3_chunks):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest_path = os.path.join(tmp_dir, "manifest.txt")
+        output_path = os.path.join(tmp_dir, "output.mp3")
+        with open(manifest_path, "w") as manifest:
+            for i, chunk in enumerate(mp3_chunks):
+                chunk_path = os.path.join(tmp_dir, f"{i}.mp3")
+                with open(chunk_path, "wb") as f:
+                    f.write(chunk)
+                manifest.write(f"file '{chunk_path}'\n")
+        subprocess.run(
+            ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", manifest_path, "-c", "copy", output_path],
+            check=True,
+            capture_output=True
+        )
+        with open(output_path, "rb") as f:
+            return f.read()
+
+# Function to map the given speakers to the ElevenLabs voice ids chosen in step 4
+def get_speaker_voice_ids(speakers):
+    available_voices = st.session_state.available_voices
+    podcasters = st.session_state.config['podcasters']
+    return {speaker: available_voices[podcasters[speaker]]['voice_id'] for speaker in speakers}
 
 # Function to display masked API key
 def display_masked_api_key():
@@ -106,6 +262,75 @@ def display_masked_api_key():
         masked_key = st.session_state.api_key[:4] + "*" * (len(st.session_state.api_key) - 8) + st.session_state.api_key[-4:]
         st.sidebar.text(f"API Key: {masked_key}")
 
+# Parse JSON text or bytes. orjson.JSONDecodeError subclasses json.JSONDecodeError,
+# so callers only need to catch the latter.
+def load_json(data):
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Serialize to indented UTF-8 JSON bytes
+def dump_json(obj):
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+# Function to parse the text script format in a single pass over its lines.
+# Sections are separated by '-------------' lines. A section starting with
+# 'Intro:' or 'Outro:' becomes one Presenter dialog; any other section holds
+# one 'Speaker: text' dialog per line.
+def parse_text_script(text):
+    script_data = []
+    presenter_lines = None  # Lines of the current Intro/Outro section
+    section_started = False
+    
+    def flush_presenter():
+        if presenter_lines is not None:
+            script_data.append({
+                'speaker': 'Presenter',
+                'text': '\n'.join(presenter_lines).strip()
+            })
+    
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if line.startswith('-------------') and not line.strip('-'):
+            flush_presenter()
+            presenter_lines = None
+            section_started = False
+            continue
+        if presenter_lines is not None:
+            presenter_lines.append(raw_line)
+            continue
+        if not line:
+            continue
+        if not section_started:
+            section_started = True
+            # Check if it's an intro or outro
+            if line.startswith(('Intro:', 'Outro:')):
+                presenter_lines = [line[6:]]
+                continue
+        # Process speaker lines
+        speaker, sep, dialog = line.partition(':')
+        if not sep:
+            continue
+        speaker = speaker.strip()
+        # If the speaker is 'Intro' or 'Outro', force to 'Presenter'
+        if speaker in ('Intro', 'Outro'):
+            speaker = 'Presenter'
+        script_data.append({
+            'speaker': speaker,
+            'text': dialog.strip()
+        })
+    flush_presenter()
+    return script_data
+
+# Function to give each dialog a stable 'uid' for widget keys. Called once
+# whenever a script is loaded rather than on every editor rerun.
+def assign_dialog_uids(script):
+    for dialog in script:
+        dialog.setdefault('uid', str(uuid.uuid4()))
+    return script
+
 # Add this function near the top of the file, after the imports
 def update_step(new_step):
     st.session_state.current_step = new_step
@@ -124,9 +349,9 @@ def step_2():
         with col1:
             if st.button("Load Script"):
                 try:
-                    script_data = json.loads(json_input)
+                    script_data = load_json(json_input)
                     if isinstance(script_data, list) and all(isinstance(item, dict) and 'speaker' in item and 'text' in item for item in script_data):
-                        st.session_state.script = script_data
+                        st.session_state.script = assign_dialog_uids(script_data)
                         st.success("Script loaded successfully!")
                         st.session_state.script_loaded = True
                     else:
@@ -136,8 +361,7 @@ def step_2():
         
         with col2:
             if st.button("Export Script"):
-                script_json = json.dumps(st.session_state.script, indent=2)
-                b64 = base64.b64encode(script_json.encode()).decode()
+                b64 = base64.b64encode(dump_json(st.session_state.script)).decode("ascii")
                 href = f'<a href="data:application/json;base64,{b64}" download="podcast_script.json">Download JSON</a>'
                 st.markdown(href, unsafe_allow_html=True)
     else:
@@ -145,45 +369,10 @@ def step_2():
         
         if st.button("Convert and Load Script"):
             try:
-                # Split the text into sections
-                sections = text_input.split('-------------')
-                script_data = []
-                
-                # Process each section
-                for section in sections:
-                    section = section.strip()
-                    if not section:
-                        continue
-                    # Check if it's an intro or outro
-                    if section.startswith('Intro:'):
-                        script_data.append({
-                            'speaker': 'Presenter',
-                            'text': section.replace('Intro:', '').strip()
-                        })
-                    elif section.startswith('Outro:'):
-                        script_data.append({
-                            'speaker': 'Presenter',
-                            'text': section.replace('Outro:', '').strip()
-                        })
-                    else:
-                        # Process speaker sections
-                        lines = section.split('\n')
-                        for line in lines:
-                            line = line.strip()
-                            if not line:
-                                continue
-                            if ':' in line:
-                                speaker, text = line.split(':', 1)
-                                # If the speaker is 'Intro' or 'Outro', force to 'Presenter'
-                                if speaker.strip() in ['Intro', 'Outro']:
-                                    speaker = 'Presenter'
-                                script_data.append({
-                                    'speaker': speaker.strip(),
-                                    'text': text.strip()
-                                })
+                script_data = parse_text_script(text_input)
                 
                 if script_data:
-                    st.session_state.script = script_data
+                    st.session_state.script = assign_dialog_uids(script_data)
                     st.success("Script converted and loaded successfully!")
                     st.session_state.script_loaded = True
                 else:
@@ -197,9 +386,9 @@ def step_2():
     uploaded_file = st.file_uploader("Import Script from JSON", type="json")
     if uploaded_file is not None:
         try:
-            imported_script = json.load(uploaded_file)
+            imported_script = load_json(uploaded_file.read())
             if isinstance(imported_script, list) and all(isinstance(item, dict) and 'speaker' in item and 'text' in item for item in imported_script):
-                st.session_state.script = imported_script
+                st.session_state.script = assign_dialog_uids(imported_script)
                 st.success("Script imported successfully!")
                 st.session_state.current_step = 3
             else:
@@ -210,31 +399,45 @@ def step_2():
 # Step 3: Display and Edit Script
 def step_3():
     st.header("Step 2: Edit Script")
-    # Ensure each dialog has a unique 'uid'
-    for dialog in st.session_state.script:
-        if 'uid' not in dialog:
-            dialog['uid'] = str(uuid.uuid4())
-    for i, line in enumerate(st.session_state.script):
-        uid = line['uid']
-        with st.expander(f"Dialog {i+1}", expanded=True):
-            is_intro = line['text'].startswith('Intro:')
-            is_outro = line['text'].startswith('Outro:')
-            if is_intro or is_outro:
-                st.session_state.script[i]['speaker'] = 'Presenter'
-                st.text_input("Speaker", 'Presenter', key=f"speaker_{uid}", disabled=True)
-            else:
-                st.session_state.script[i]['speaker'] = st.text_input("Speaker", line['speaker'], key=f"speaker_{uid}")
-            st.session_state.script[i]['text'] = st.text_area("Dialog", line['text'], key=f"line_{uid}", height=100)
-            col_add, col_delete = st.columns([1, 1])
-            with col_add:
-                if st.button("➕ Add Dialog Below", key=f"add_below_{uid}"):
-                    st.session_state.script.insert(i+1, {"speaker": "", "text": "", "uid": str(uuid.uuid4())})
-                    st.rerun()
-            with col_delete:
-                if st.button("🗑️ Delete Dialog", key=f"delete_{uid}"):
-                    st.session_state.script.pop(i)
-                    st.rerun()
-    st.button("Proceed to Configuration", on_click=update_step, args=(4,))
+    # Edits are batched in a form so typing does not rerun the whole editor.
+    # Add/Delete/Proceed are submit buttons too, so pending edits are kept when used.
+    insert_after = None
+    delete_index = None
+    proceed = False
+    with st.form("edit_script_form"):
+        for i, line in enumerate(st.session_state.script):
+            uid = line['uid']
+            with st.expander(f"Dialog {i+1}", expanded=True):
+                is_intro = line['text'].startswith('Intro:')
+                is_outro = line['text'].startswith('Outro:')
+                if is_intro or is_outro:
+                    st.session_state.script[i]['speaker'] = 'Presenter'
+                    st.text_input("Speaker", 'Presenter', key=f"speaker_{uid}", disabled=True)
+                else:
+                    st.session_state.script[i]['speaker'] = st.text_input("Speaker", line['speaker'], key=f"speaker_{uid}")
+                st.session_state.script[i]['text'] = st.text_area("Dialog", line['text'], key=f"line_{uid}", height=100)
+                col_add, col_delete = st.columns([1, 1])
+                with col_add:
+                    if st.form_submit_button(f"➕ Add Dialog Below {i+1}"):
+                        insert_after = i
+                with col_delete:
+                    if st.form_submit_button(f"🗑️ Delete Dialog {i+1}"):
+                        delete_index = i
+        col_save, col_proceed = st.columns([1, 1])
+        with col_save:
+            st.form_submit_button("Save Edits")
+        with col_proceed:
+            proceed = st.form_submit_button("Proceed to Configuration")
+    if insert_after is not None:
+        st.session_state.script.insert(insert_after+1, {"speaker": "", "text": "", "uid": str(uuid.uuid4())})
+        st.rerun()
+    if delete_index is not None:
+        st.session_state.script.pop(delete_index)
+        st.rerun()
+    if proceed:
+        # The loop above has already written the submitted edits into the script
+        update_step(4)
+        st.rerun()
 
 # Step 4: Configuration
 def step_4():
@@ -242,10 +445,13 @@ def step_4():
     
     # Ensure voices are loaded
     if not st.session_state.available_voices:
-        st.session_state.available_voices = get_available_voices()
+        st.session_state.available_voices = get_available_voices(st.session_state.api_key)
     
     st.subheader("Podcasters")
-    podcasters = set(line['speaker'] for line in st.session_state.script)
+    # Keep first-seen order so the settings panels don't shuffle between reruns
+    podcasters = list(dict.fromkeys(line['speaker'] for line in st.session_state.script))
+    available_voices = list(st.session_state.available_voices.keys())
+    voice_to_idx = {voice: i for i, voice in enumerate(available_voices)}
     
     # Default voice mappings
     default_voices = {
@@ -275,21 +481,18 @@ def step_4():
                 default_voice_name = default_voices[podcaster]["name"]
                 # Find the full voice name from available voices that contains our default name
                 matching_voice = next(
-                    (voice for voice in st.session_state.available_voices.keys() 
+                    (voice for voice in available_voices 
                      if default_voices[podcaster]["name"] in voice),
-                    list(st.session_state.available_voices.keys())[0]  # fallback to first voice if not found
+                    available_voices[0]  # fallback to first voice if not found
                 )
                 st.session_state.config['podcasters'][podcaster] = matching_voice
             else:
-                st.session_state.config['podcasters'][podcaster] = list(st.session_state.available_voices.keys())[0]
+                st.session_state.config['podcasters'][podcaster] = available_voices[0]
         
         # Voice selection
-        available_voices = list(st.session_state.available_voices.keys())
         current_voice = st.session_state.config['podcasters'][podcaster]
-        
-        try:
-            voice_index = available_voices.index(current_voice)
-        except ValueError:
+        voice_index = voice_to_idx.get(current_voice)
+        if voice_index is None:
             voice_index = 0
             st.session_state.config['podcasters'][podcaster] = available_voices[0]
         
@@ -328,7 +531,7 @@ def step_4():
         if st.button(f"Play {podcaster} Voice Sample", key=f"sample_{podcaster}"):
             voice_data = st.session_state.available_voices[st.session_state.config['podcasters'][podcaster]]
             if voice_data['samples']:
-                sample = get_voice_sample(voice_data['voice_id'], voice_data['samples'][0]['sample_id'])
+                sample = get_voice_sample(voice_data['voice_id'], voice_data['samples'][0]['sample_id'], st.session_state.api_key)
                 if sample:
                     st.audio(sample, format="audio/mp3")
                 else:
@@ -350,22 +553,13 @@ def step_5():
         progress_name = st.text_input("Progress Name (Optional)", key="progress_name")
         if st.button("💾 Save Progress to App (Optional)", key="save_progress_sqlite"):
             if progress_name.strip():
-                # Serialize audio_segments as base64-encoded MP3 bytes
-                audio_segments_serialized = []
-                for label, audio in st.session_state.audio_segments:
-                    if audio:
-                        buf = io.BytesIO()
-                        audio.export(buf, format="mp3")
-                        b64_audio = base64.b64encode(buf.getvalue()).decode()
-                        audio_segments_serialized.append((label, b64_audio))
-                    else:
-                        audio_segments_serialized.append((label, None))
-                database.save_progress(progress_name.strip(), st.session_state.script, st.session_state.config, audio_segments_serialized)
+                # Audio segments are stored as raw MP3 BLOBs
+                database.save_progress(progress_name.strip(), st.session_state.script, st.session_state.config, st.session_state.audio_segments)
                 st.success(f"Progress '{progress_name.strip()}' saved!")
             else:
                 st.warning("Please enter a name for your progress.")
     with col_load:
-        all_progress = database.get_all_progress()
+        all_progress = list(database.get_all_progress())
         if all_progress:
             options = [f"{p['name']} ({p['created_at']})" for p in all_progress]
             selected = st.selectbox("Load Saved Progress", options, key="progress_select", index=None)
@@ -375,21 +569,10 @@ def step_5():
                 if st.button("Load Selected Progress", key="load_progress_sqlite"):
                     loaded = database.load_progress_by_id(progress_id)
                     if loaded:
-                        st.session_state.script = loaded['script']
+                        st.session_state.script = assign_dialog_uids(loaded['script'])
                         st.session_state.config = loaded['config']
-                        # Deserialize audio_segments
-                        audio_segments_deserialized = []
-                        if loaded.get('audio_segments'):
-                            for label, b64_audio in loaded['audio_segments']:
-                                if b64_audio:
-                                    audio_bytes = base64.b64decode(b64_audio)
-                                    audio = AudioSegment.from_mp3(io.BytesIO(audio_bytes))
-                                    audio_segments_deserialized.append((label, audio))
-                                else:
-                                    audio_segments_deserialized.append((label, None))
-                            st.session_state.audio_segments = audio_segments_deserialized
-                        else:
-                            st.session_state.audio_segments = []
+                        # Segments come back as raw MP3 bytes, so no decoding is needed
+                        st.session_state.audio_segments = list(loaded.get('audio_segments') or [])
                         st.success("Progress loaded! You can continue editing or generating audio.")
                         st.rerun()
                 # Add option to delete the selected progress
@@ -402,40 +585,79 @@ def step_5():
     # --- End Save/Load Progress ---
     if st.button("Generate All Audio"):
         st.session_state.audio_segments = []
+        client = init_elevenlabs_client()
+        script = st.session_state.script
+        # Only the speakers in this script; config may hold stale podcasters
+        speaker_to_voice_id = get_speaker_voice_ids({line['speaker'] for line in script})
+        voice_settings_per_speaker = st.session_state.config['voice_settings_per_speaker']
+        results = [None] * len(script)
+        failed = {}
+        progress = st.progress(0.0, text="Generating audio...")
         
-        # Generate dialog audio
-        for i, line in enumerate(st.session_state.script):
-            speaker = line['speaker']
-            voice_name = st.session_state.config['podcasters'][speaker]
-            audio = generate_audio(
-                line['text'],
-                st.session_state.available_voices[voice_name]['voice_id'],
-                speaker
-            )
-            st.session_state.audio_segments.append((f"Line {i+1}", audio))
+        # Generate dialog audio concurrently; session state is read here on the
+        # main thread because worker threads have no Streamlit script context
+        with st.spinner(f"Generating audio for {len(script)} lines..."):
+            with ThreadPoolExecutor(max_workers=MAX_TTS_WORKERS) as executor:
+                futures = {}
+                for i, line in enumerate(script):
+                    speaker = line['speaker']
+                    future = executor.submit(
+                        synthesize_line,
+                        client,
+                        line['text'],
+                        speaker_to_voice_id[speaker],
+                        voice_settings_per_speaker[speaker]
+                    )
+                    futures[future] = i
+                for done, future in enumerate(as_completed(futures), start=1):
+                    i = futures[future]
+                    if future.cancelled():
+                        continue
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        failed[i] = e
+                        # Don't start (and pay for) lines queued behind a failure
+                        for pending in futures:
+                            pending.cancel()
+                    progress.progress(done / len(script), text=f"Generated {done}/{len(script)} lines")
         
-        st.success("Audio generated successfully!")
+        # Keep every line that succeeded; failed or skipped lines are stored as
+        # None, which finalizing skips
+        st.session_state.audio_segments = [(f"Line {i+1}", mp3_bytes) for i, mp3_bytes in enumerate(results)]
+        
+        if failed:
+            for i, e in sorted(failed.items()):
+                st.error(f"Error generating audio for Line {i+1}: {str(e)}")
+            skipped = sum(1 for future in futures if future.cancelled())
+            if skipped:
+                st.warning(f"Skipped {skipped} lines that had not started. Generate again to retry them.")
+        else:
+            st.success("Audio generated successfully!")
     
     # Load saved generated audio if available
     if st.session_state.get('audio_segments'):
         st.subheader("Generated Audio Segments")
-        for i, (label, audio) in enumerate(st.session_state.audio_segments):
+        for i, (label, mp3_bytes) in enumerate(st.session_state.audio_segments):
             with st.container():
                 st.subheader(label)
-                st.audio(audio.export(format="mp3").read(), format="audio/mp3")
+                if mp3_bytes:
+                    st.audio(mp3_bytes, format="audio/mp3")
+                else:
+                    st.info("No audio for this line yet. Regenerate it to retry.")
                 
                 line_index = int(label.split()[1]) - 1
                 speaker = st.session_state.script[line_index]['speaker']
                 new_text = st.text_area(f"Edit {label} text:", st.session_state.script[line_index]['text'], key=f"edit_{i}")
                 
                 if st.button(f"Regenerate {label}", key=f"regen_{i}"):
-                    new_audio = generate_audio(
+                    new_mp3_bytes = regenerate_audio(
                         new_text,
-                        st.session_state.available_voices[st.session_state.config['podcasters'][speaker]]['voice_id'],
+                        get_speaker_voice_ids([speaker])[speaker],
                         speaker
                     )
                     st.session_state.script[line_index]['text'] = new_text
-                    st.session_state.audio_segments[i] = (label, new_audio)
+                    st.session_state.audio_segments[i] = (label, new_mp3_bytes)
                     st.rerun()
     
     st.button("Proceed to Finalization", on_click=update_step, args=(6,))
@@ -459,26 +681,28 @@ def step_6():
 
         if not st.session_state.podcast_finalized:
             if st.button("Finalize Podcast"):
-                # Initialize audio segments
-                intro_audio = AudioSegment.empty()
-                outro_audio = AudioSegment.empty()
-                hosts_discussion = AudioSegment.empty()
+                # Collect MP3 chunks for each part of the podcast
+                intro_chunks = []
+                outro_chunks = []
+                hosts_chunks = []
+                pause = get_pause_mp3()
                 
-                for i, (label, audio) in enumerate(st.session_state.audio_segments):
+                for i, (label, mp3_bytes) in enumerate(st.session_state.audio_segments):
+                    if not mp3_bytes:
+                        continue
                     # Add appropriate pause between segments
-                    pause = AudioSegment.silent(duration=300)
                     if i == 0:
-                        intro_audio += audio + pause
+                        intro_chunks += [mp3_bytes, pause]
                     elif i == len(st.session_state.audio_segments) - 1:
-                        outro_audio += audio + pause
+                        outro_chunks += [mp3_bytes, pause]
                     else:
-                        hosts_discussion += audio + pause
+                        hosts_chunks += [mp3_bytes, pause]
                 
                 try:
-                    # Convert audio segments to bytes
-                    intro_bytes = intro_audio.export(format="mp3").read() if len(intro_audio) > 0 else None
-                    hosts_bytes = hosts_discussion.export(format="mp3").read() if len(hosts_discussion) > 0 else None
-                    outro_bytes = outro_audio.export(format="mp3").read() if len(outro_audio) > 0 else None
+                    # Join each part without re-encoding
+                    intro_bytes = concat_mp3(intro_chunks) if intro_chunks else None
+                    hosts_bytes = concat_mp3(hosts_chunks) if hosts_chunks else None
+                    outro_bytes = concat_mp3(outro_chunks) if outro_chunks else None
                     
                     # Save to database
                     podcast_id = database.save_podcast(
@@ -508,7 +732,7 @@ def step_7():
     3. **Download** or delete segments as needed.
     """)
     
-    podcasts = database.get_all_podcasts()
+    podcasts = list(database.get_all_podcasts())
     if not podcasts:
         st.warning("No podcasts have been generated yet.")
         return
@@ -598,17 +822,12 @@ def main():
     
     # Navigation
     st.sidebar.title("Navigation")
-    step_buttons = []
     for i, step in enumerate([
         "Input Script", "Edit Script", "Configuration",
         "Generate Audio", "Finalize", "Play and Download"
     ]):
-        is_enabled = True
-        step_buttons.append(st.sidebar.button(f"Step {i+1}: {step}", disabled=not is_enabled))
-    
-    if any(step_buttons):
-        clicked_step = step_buttons.index(True)
-        st.session_state.current_step = clicked_step + 2  # Start from step 2
+        # Step numbers start from step 2
+        st.sidebar.button(f"Step {i+1}: {step}", key=f"nav_{i}", on_click=update_step, args=(i+2,))
     
     if st.session_state.current_step == 2:
         step_2()
@@ -1,38 +1,309 @@
 import sqlite3
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import json
-import pytz
+import base64
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+# orjson serializes straight to bytes and is much faster than the stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# zstd shrinks the highly repetitive script/config JSON several-fold
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DB_PATH = 'podcast.db'
+# Finalized podcast audio is stored as files here; the database keeps the paths
+SEGMENTS_DIR = 'segments'
+# Podcast segments in playback order, as passed to save_podcast()
+SEGMENT_TYPES = ('intro', 'hosts_discussion', 'outro')
+# Bump when init_db() gains a new table, index or migration
+SCHEMA_VERSION = 1
+# WAL lets any number of readers run alongside one writer, as long as each
+# reader has its own connection
+READ_POOL_SIZE = os.cpu_count() or 4
+# Asia/Manila is a fixed UTC+8 with no DST; the name matches what pytz reported
+MANILA_TZ = timezone(timedelta(hours=8), 'PST')
+
+# SQL used on the request path. Keeping each statement as one shared string
+# means every call hits sqlite3's per-connection prepared-statement cache.
+SQL_INSERT_PODCAST = 'INSERT INTO podcasts (title) VALUES (?)'
+SQL_INSERT_PODCAST_SEGMENT = '''
+    INSERT INTO podcast_segments (podcast_id, segment_type, audio_path, audio_size)
+    VALUES (?, ?, ?, ?)
+'''
+SQL_SELECT_PODCASTS = '''
+    SELECT id, title, created_at, updated_at
+    FROM podcasts
+    ORDER BY created_at DESC
+    LIMIT ? OFFSET ?
+'''
+SQL_SELECT_PODCAST_SEGMENTS = '''
+    SELECT segment_type, audio_path
+    FROM podcast_segments
+    WHERE podcast_id = ?
+'''
+SQL_SELECT_SEGMENT_PATH = 'SELECT audio_path FROM podcast_segments WHERE podcast_id = ? AND segment_type = ?'
+SQL_SELECT_SEGMENT_PATHS = 'SELECT audio_path FROM podcast_segments WHERE podcast_id = ?'
+SQL_DELETE_PODCAST = 'DELETE FROM podcasts WHERE id = ?'
+SQL_SELECT_PROGRESS_LIST = 'SELECT id, name, created_at FROM progress ORDER BY created_at DESC LIMIT ? OFFSET ?'
+SQL_INSERT_PROGRESS = 'INSERT INTO progress (name, script, config, created_at) VALUES (?, ?, ?, ?)'
+SQL_INSERT_PROGRESS_SEGMENT = '''
+    INSERT INTO progress_segments (progress_id, position, label, audio_data)
+    VALUES (?, ?, ?, ?)
+'''
+SQL_SELECT_PROGRESS = 'SELECT script, config, audio_segments FROM progress WHERE id = ?'
+SQL_SELECT_PROGRESS_SEGMENTS = '''
+    SELECT label, audio_data
+    FROM progress_segments
+    WHERE progress_id = ?
+    ORDER BY position
+'''
+SQL_DELETE_PROGRESS = 'DELETE FROM progress WHERE id = ?'
+# Rows per executemany() call in save_podcasts_many()
+BULK_BATCH_SIZE = 10000
+# Large enough to hold every statement above plus the PRAGMAs
+STATEMENT_CACHE_SIZE = 256
+# Seconds between background WAL checkpoints
+CHECKPOINT_INTERVAL = 30
+
+# Writes go through a single shared connection serialized by a lock; reads
+# borrow read-only connections from a bounded pool.
+_writer = None
+_writer_lock = threading.Lock()
+_read_pool = queue.Queue(maxsize=READ_POOL_SIZE)
+
+def _connect(read_only=False):
+    """Open a connection to the database with per-connection PRAGMAs applied."""
+    if read_only:
+        conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        # Readers shape rows as mappings in C rather than indexing tuples in Python
+        conn.row_factory = sqlite3.Row
+    else:
+        # Autocommit mode; write_tx() issues BEGIN IMMEDIATE/COMMIT explicitly
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-64000')
+    conn.execute('PRAGMA mmap_size=268435456')
+    # Checkpoints run on _checkpoint_loop()'s thread instead of inside a commit
+    conn.execute('PRAGMA wal_autocheckpoint=0')
+    return conn
+
+@contextmanager
+def ro_conn():
+    """Borrow a read-only connection from the pool."""
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        conn = _connect(read_only=True)
+    try:
+        yield conn
+    finally:
+        try:
+            _read_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+@contextmanager
+def rw_conn():
+    """Hold the writer lock and yield the shared read/write connection."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _connect()
+        yield _writer
+
+def _checkpoint_loop():
+    """Periodically copy the WAL back into the database and truncate it."""
+    conn = _connect()
+    # Give up at once instead of holding writers off while readers finish
+    conn.execute('PRAGMA busy_timeout=0')
+    while True:
+        time.sleep(CHECKPOINT_INTERVAL)
+        try:
+            # PASSIVE never blocks; truncate only once the whole WAL is copied back
+            busy, log_frames, checkpointed = conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+            if not busy and log_frames > 0 and checkpointed == log_frames:
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except sqlite3.Error:
+            # Busy or locked; the next pass picks up where this one left off
+            pass
+
+@contextmanager
+def write_tx(conn):
+    """Run a block in a BEGIN IMMEDIATE transaction on an autocommit connection.
+    
+    Taking the write lock up front avoids SQLITE_BUSY lock upgrades mid-transaction
+    and gives exactly one commit per write.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+        conn.execute('COMMIT')
+    except BaseException:
+        # SQLite may already have rolled back (e.g. SQLITE_FULL), and a failed
+        # COMMIT leaves the transaction open on the shared writer connection
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+def _dumps(obj):
+    """Serialize to JSON bytes, which SQLite stores as a BLOB with no re-encoding."""
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+def _loads(data):
+    """Parse JSON stored as bytes or, for older rows, as text."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Every zstd frame starts with this magic number; JSON never does
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Only used under the writer lock; zstd (de)compressor objects aren't thread-safe
+_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+
+def _pack(obj):
+    """Serialize to JSON bytes, zstd-compressed when zstandard is installed."""
+    data = _dumps(obj)
+    if zstandard:
+        return _compressor.compress(data)
+    return data
+
+def _unpack(data):
+    """Parse a value written by _pack(), compressed or not."""
+    if isinstance(data, bytes) and data.startswith(ZSTD_MAGIC):
+        if not zstandard:
+            raise RuntimeError('zstandard is required to read compressed progress data')
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return _loads(data)
+
+def _write_file(path, data):
+    """Write any bytes-like object to path, replacing any existing file.
+    
+    Writes go through a byte memoryview so partial writes are resumed by
+    slicing the view, never by copying the remaining data.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data).cast('B')
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def _read_file(path):
+    """Read a whole file as bytes."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _segment_path(podcast_id, segment_type):
+    return os.path.join(SEGMENTS_DIR, f'{podcast_id}_{segment_type}.mp3')
+
+# Column definitions shared by init_db() and the migrations that rebuild tables
+PODCAST_SEGMENTS_COLUMNS = '''
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    podcast_id INTEGER,
+    segment_type TEXT NOT NULL,
+    audio_path TEXT NOT NULL,
+    audio_size INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (podcast_id) REFERENCES podcasts (id) ON DELETE CASCADE
+'''
+
+PROGRESS_SEGMENTS_COLUMNS = '''
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    progress_id INTEGER,
+    position INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    audio_data BLOB,
+    FOREIGN KEY (progress_id) REFERENCES progress (id) ON DELETE CASCADE
+'''
+
+def _needs_rebuild(conn, table):
+    """Check whether a segments table predates ON DELETE CASCADE."""
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    return 'ON DELETE CASCADE' not in sql
+
+def _migrate_podcast_segments(conn):
+    """Rebuild podcast_segments from older schemas.
+    
+    Audio stored in the audio_data BLOB column is moved out to files, and the
+    podcast foreign key gains ON DELETE CASCADE.
+    """
+    if not _needs_rebuild(conn, 'podcast_segments'):
+        return
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(podcast_segments)')]
+    conn.execute(f'CREATE TABLE podcast_segments_new ({PODCAST_SEGMENTS_COLUMNS})')
+    if 'audio_data' in columns:
+        # Step through the rows rather than fetchall(), so only one segment's
+        # audio is in memory at a time
+        rows = conn.execute('''
+            SELECT id, podcast_id, segment_type, audio_data, created_at FROM podcast_segments
+        ''')
+        for segment_id, podcast_id, segment_type, audio_data, created_at in rows:
+            path = _segment_path(podcast_id, segment_type)
+            _write_file(path, audio_data)
+            conn.execute('''
+                INSERT INTO podcast_segments_new (id, podcast_id, segment_type, audio_path, audio_size, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (segment_id, podcast_id, segment_type, path, len(audio_data), created_at))
+    else:
+        conn.execute('''
+            INSERT INTO podcast_segments_new (id, podcast_id, segment_type, audio_path, audio_size, created_at)
+            SELECT id, podcast_id, segment_type, audio_path, audio_size, created_at FROM podcast_segments
+        ''')
+    conn.execute('DROP TABLE podcast_segments')
+    conn.execute('ALTER TABLE podcast_segments_new RENAME TO podcast_segments')
+
+def _migrate_progress_segments(conn):
+    """Rebuild progress_segments so its progress foreign key cascades on delete."""
+    if not _needs_rebuild(conn, 'progress_segments'):
+        return
+    conn.execute(f'CREATE TABLE progress_segments_new ({PROGRESS_SEGMENTS_COLUMNS})')
+    conn.execute('''
+        INSERT INTO progress_segments_new (id, progress_id, position, label, audio_data)
+        SELECT id, progress_id, position, label, audio_data FROM progress_segments
+    ''')
+    conn.execute('DROP TABLE progress_segments')
+    conn.execute('ALTER TABLE progress_segments_new RENAME TO progress_segments')
 
 def init_db():
-    """Initialize the database and create tables if they don't exist."""
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
+    """Initialize the database, create tables and run any pending migrations."""
+    conn = _connect()
+    
+    # WAL is persistent in the database file, so it only needs setting once
+    conn.execute('PRAGMA journal_mode=WAL')
+    # Table rebuilds below copy rows as-is, including any orphaned segments
+    conn.execute('PRAGMA foreign_keys=OFF')
     
-    # Create podcasts table
-    c.execute('''
+    # Create all tables in one script so SQLite parses the DDL in a single pass
+    conn.executescript(f'''
+        BEGIN IMMEDIATE;
+        
         CREATE TABLE IF NOT EXISTS podcasts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create podcast_segments table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS podcast_segments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            podcast_id INTEGER,
-            segment_type TEXT NOT NULL,
-            audio_data BLOB NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (podcast_id) REFERENCES podcasts (id)
-        )
-    ''')
-    
-    # Create progress table
-    c.execute('''
+        );
+        
+        CREATE TABLE IF NOT EXISTS podcast_segments ({PODCAST_SEGMENTS_COLUMNS});
+        
         CREATE TABLE IF NOT EXISTS progress (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -40,144 +311,212 @@ def init_db():
             config TEXT NOT NULL,
             audio_segments TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+        );
+        
+        -- Raw MP3 bytes for each generated line of a saved progress
+        CREATE TABLE IF NOT EXISTS progress_segments ({PROGRESS_SEGMENTS_COLUMNS});
+        
+        COMMIT;
     ''')
     
-    conn.commit()
+    # Migrations, indexes and the version stamp apply atomically
+    with write_tx(conn):
+        # Older databases hold audio as BLOBs and lack the cascading foreign keys
+        _migrate_podcast_segments(conn)
+        _migrate_progress_segments(conn)
+        
+        # Indexes for the listing sorts, segment lookups and cascading deletes.
+        # Created after the migrations, since rebuilding a table drops its indexes.
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_podcasts_created ON podcasts (created_at DESC)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_progress_created ON progress (created_at DESC)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_segments_podcast ON podcast_segments (podcast_id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_progress_segments_progress ON progress_segments (progress_id, position)')
+        
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    
     conn.close()
 
-def save_podcast(title, intro_audio=None, hosts_audio=None, outro_audio=None):
-    """Save a podcast and its segments to the database."""
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
-    
+def _schema_is_current():
+    """Check whether the database exists and init_db() has already brought it up to date."""
+    if not os.path.exists(DB_PATH):
+        return False
+    conn = sqlite3.connect(DB_PATH)
     try:
-        # Insert podcast
-        c.execute('INSERT INTO podcasts (title) VALUES (?)', (title,))
-        podcast_id = c.lastrowid
-        
-        # Save segments if provided
-        if intro_audio:
-            c.execute('''
-                INSERT INTO podcast_segments (podcast_id, segment_type, audio_data)
-                VALUES (?, ?, ?)
-            ''', (podcast_id, 'intro', intro_audio))
-        
-        if hosts_audio:
-            c.execute('''
-                INSERT INTO podcast_segments (podcast_id, segment_type, audio_data)
-                VALUES (?, ?, ?)
-            ''', (podcast_id, 'hosts_discussion', hosts_audio))
-        
-        if outro_audio:
-            c.execute('''
-                INSERT INTO podcast_segments (podcast_id, segment_type, audio_data)
-                VALUES (?, ?, ?)
-            ''', (podcast_id, 'outro', outro_audio))
-        
-        conn.commit()
-        return podcast_id
-    except Exception as e:
-        conn.rollback()
-        raise e
+        return conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION
     finally:
         conn.close()
 
-def get_all_podcasts():
-    """Get all podcasts with their basic information."""
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
+def _write_segments(podcast_id, audios, written_paths):
+    """Write a podcast's (intro, hosts, outro) audio to files and return the segment rows.
     
-    c.execute('''
-        SELECT id, title, created_at, updated_at
-        FROM podcasts
-        ORDER BY created_at DESC
-    ''')
+    Each path is appended to written_paths before its file is written, so the
+    caller can remove partial files if anything later fails.
+    """
+    rows = []
+    for segment_type, audio_data in zip(SEGMENT_TYPES, audios):
+        if audio_data:
+            # Accept bytes, bytearray or memoryview without copying
+            view = memoryview(audio_data).cast('B')
+            path = _segment_path(podcast_id, segment_type)
+            written_paths.append(path)
+            _write_file(path, view)
+            rows.append((podcast_id, segment_type, path, view.nbytes))
+    return rows
+
+def _remove_files(paths):
+    """Remove any of the given files that exist."""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def save_podcast(title, intro_audio=None, hosts_audio=None, outro_audio=None):
+    """Save a podcast and its segments to the database."""
+    written_paths = []
+    with rw_conn() as conn:
+        try:
+            with write_tx(conn):
+                # Insert podcast
+                podcast_id = conn.execute(SQL_INSERT_PODCAST, (title,)).lastrowid
+                
+                # Save segments if provided. Audio goes to files so the database
+                # only carries a path and size per segment.
+                rows = _write_segments(podcast_id, (intro_audio, hosts_audio, outro_audio), written_paths)
+                conn.executemany(SQL_INSERT_PODCAST_SEGMENT, rows)
+        except Exception:
+            # Don't leave orphaned files behind when the insert is rolled back
+            _remove_files(written_paths)
+            raise
+    return podcast_id
+
+def save_podcasts_many(items):
+    """Save many podcasts in one transaction and return their ids in order.
     
-    podcasts = c.fetchall()
-    conn.close()
+    Each item is a dict with a 'title' and optional 'intro_audio',
+    'hosts_audio' and 'outro_audio', matching save_podcast()'s arguments.
+    """
+    podcast_ids = []
+    written_paths = []
+    with rw_conn() as conn:
+        try:
+            with write_tx(conn):
+                for start in range(0, len(items), BULK_BATCH_SIZE):
+                    batch = items[start:start + BULK_BATCH_SIZE]
+                    conn.executemany(SQL_INSERT_PODCAST, [(item['title'],) for item in batch])
+                    # The writer lock is held, so the batch's AUTOINCREMENT ids are
+                    # consecutive and end at last_insert_rowid()
+                    last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+                    batch_ids = range(last_id - len(batch) + 1, last_id + 1)
+                    podcast_ids.extend(batch_ids)
+                    
+                    rows = []
+                    for podcast_id, item in zip(batch_ids, batch):
+                        audios = (item.get('intro_audio'), item.get('hosts_audio'), item.get('outro_audio'))
+                        rows.extend(_write_segments(podcast_id, audios, written_paths))
+                    conn.executemany(SQL_INSERT_PODCAST_SEGMENT, rows)
+        except Exception:
+            # Don't leave orphaned files behind when the inserts are rolled back
+            _remove_files(written_paths)
+            raise
+    return podcast_ids
+
+def get_all_podcasts(limit=None, offset=0):
+    """Yield podcasts with their basic information, newest first.
     
-    return [{
-        'id': p[0],
-        'title': p[1],
-        'created_at': p[2],
-        'updated_at': p[3]
-    } for p in podcasts]
+    The pooled connection is held until the generator is exhausted or closed,
+    so callers that keep the rows around should wrap it in list().
+    """
+    with ro_conn() as conn:
+        # LIMIT -1 means no limit in SQLite
+        for row in conn.execute(SQL_SELECT_PODCASTS, (-1 if limit is None else limit, offset)):
+            yield dict(row)
 
 def get_podcast_segments(podcast_id):
-    """Get all segments for a specific podcast."""
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
-    
-    c.execute('''
-        SELECT segment_type, audio_data
-        FROM podcast_segments
-        WHERE podcast_id = ?
-    ''', (podcast_id,))
+    """Get all segments for a specific podcast as {segment_type: audio bytes}."""
+    with ro_conn() as conn:
+        cursor = conn.execute(SQL_SELECT_PODCAST_SEGMENTS, (podcast_id,))
+        cursor.row_factory = None  # Plain tuples; the rows are unpacked, not keyed
+        segments = cursor.fetchall()
     
-    segments = c.fetchall()
-    conn.close()
+    return {segment_type: _read_file(audio_path) for segment_type, audio_path in segments}
+
+def open_segment(podcast_id, segment_type):
+    """Open one podcast segment's audio for streaming, or return None if missing.
     
-    return {segment[0]: segment[1] for segment in segments}
+    The caller owns the returned binary file and should read it in chunks
+    (e.g. 64 KB) and close it, rather than loading the whole segment at once.
+    """
+    with ro_conn() as conn:
+        row = conn.execute(SQL_SELECT_SEGMENT_PATH, (podcast_id, segment_type)).fetchone()
+    if row is None:
+        return None
+    return open(row['audio_path'], 'rb')
 
 def delete_podcast(podcast_id):
     """Delete a podcast and all its segments."""
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
-    
-    try:
-        # Delete segments first (due to foreign key constraint)
-        c.execute('DELETE FROM podcast_segments WHERE podcast_id = ?', (podcast_id,))
-        # Delete podcast
-        c.execute('DELETE FROM podcasts WHERE id = ?', (podcast_id,))
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+    with rw_conn() as conn:
+        with write_tx(conn):
+            paths = [row[0] for row in conn.execute(SQL_SELECT_SEGMENT_PATHS, (podcast_id,))]
+            # Segment rows are removed by ON DELETE CASCADE
+            conn.execute(SQL_DELETE_PODCAST, (podcast_id,))
+        
+        # Remove the audio files only once the rows are gone
+        _remove_files(paths)
 
-def get_all_progress():
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT id, name, created_at FROM progress ORDER BY created_at DESC
-    ''')
-    rows = c.fetchall()
-    conn.close()
-    return [{'id': row[0], 'name': row[1], 'created_at': row[2]} for row in rows]
+def get_all_progress(limit=None, offset=0):
+    """Yield saved progress entries, newest first (see get_all_podcasts())."""
+    with ro_conn() as conn:
+        for row in conn.execute(SQL_SELECT_PROGRESS_LIST, (-1 if limit is None else limit, offset)):
+            yield dict(row)
 
 def save_progress(name, script, config, audio_segments=None):
-    tz = pytz.timezone('Asia/Manila')
-    now = datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S %Z')
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO progress (name, script, config, audio_segments, created_at) VALUES (?, ?, ?, ?, ?)
-    ''', (name, json.dumps(script), json.dumps(config), json.dumps(audio_segments) if audio_segments else None, now))
-    conn.commit()
-    conn.close()
+    """Save progress. audio_segments is a list of (label, mp3_bytes or None)."""
+    now = datetime.now(MANILA_TZ).strftime('%Y-%m-%d %H:%M:%S %Z')
+    with rw_conn() as conn:
+        with write_tx(conn):
+            progress_id = conn.execute(
+                SQL_INSERT_PROGRESS, (name, _pack(script), _pack(config), now)
+            ).lastrowid
+            
+            # Store audio as raw BLOBs rather than base64 text
+            if audio_segments:
+                conn.executemany(SQL_INSERT_PROGRESS_SEGMENT, [
+                    (progress_id, position, label, audio_data)
+                    for position, (label, audio_data) in enumerate(audio_segments)
+                ])
 
 def load_progress_by_id(progress_id):
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
-    c.execute('SELECT script, config, audio_segments FROM progress WHERE id = ?', (progress_id,))
-    row = c.fetchone()
-    conn.close()
+    """Load progress. audio_segments is a list of (label, mp3_bytes or None)."""
+    with ro_conn() as conn:
+        row = conn.execute(SQL_SELECT_PROGRESS, (progress_id,)).fetchone()
+        cursor = conn.execute(SQL_SELECT_PROGRESS_SEGMENTS, (progress_id,))
+        cursor.row_factory = None  # Segments are returned as (label, audio) tuples
+        segments = cursor.fetchall()
     if row:
+        if segments:
+            audio_segments = segments
+        elif row['audio_segments']:
+            # Progress saved before progress_segments existed holds base64 JSON
+            audio_segments = [(label, base64.b64decode(b64_audio) if b64_audio else None)
+                              for label, b64_audio in _loads(row['audio_segments'])]
+        else:
+            audio_segments = None
         return {
-            'script': json.loads(row[0]),
-            'config': json.loads(row[1]),
-            'audio_segments': json.loads(row[2]) if row[2] else None
+            'script': _unpack(row['script']),
+            'config': _unpack(row['config']),
+            'audio_segments': audio_segments
         }
     return None
 
 def delete_progress(progress_id):
-    conn = sqlite3.connect('podcast.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM progress WHERE id = ?', (progress_id,))
-    conn.commit()
-    conn.close()
+    """Delete a saved progress and its audio segments."""
+    with rw_conn() as conn:
+        with write_tx(conn):
+            # Segment rows are removed by ON DELETE CASCADE
+            conn.execute(SQL_DELETE_PROGRESS, (progress_id,))
 
-# Initialize database when module is imported
-init_db() 
\ No newline at end of file
+# Initialize database when module is imported, unless it is already up to date
+os.makedirs(SEGMENTS_DIR, exist_ok=True)
+if not _schema_is_current():
+    init_db()
+threading.Thread(target=_checkpoint_loop, name='wal-checkpoint', daemon=True).start()
+ 
\ No newline at end of file